@@ -6,103 +6,150 @@
 
 import os
 import sys
+import mmap
+import queue
 import click
-import bincopy
-import traceback
+import threading
+from contextlib import contextmanager, closing
+from collections.abc import Iterator
 
 from mboot import McuBoot, scan_usb, ExtMemId, CommandTag, PropertyTag, parse_property_value
+from mboot.properties import size_fmt
 
 
 ########################################################################################################################
 # Helper methods
 ########################################################################################################################
-def hexdump(data, start_address=0, compress=True, length=16, sep='.'):
-    """ Return string array in hex-dump format
-    :param data:          The data array of bytes
+
+# Lookup tables used by hexdump (byte -> hex column item, byte -> printable ASCII char)
+_HEX_TABLE = tuple("{:02X} ".format(i) for i in range(256))
+_PRINTABLE_TABLE = bytes(i if 0x20 <= i < 0x7F else ord('.') for i in range(256))
+
+
+if sys.version_info >= (3, 8):
+    def _hex_column(data):
+        """ Return data as hex string with 'XX ' per byte (formatted by C implementation of bytes.hex) """
+        return data.hex(' ').upper() + ' ' if data else ''
+else:
+    def _hex_column(data):
+        """ Return data as hex string with 'XX ' per byte """
+        return ''.join(map(_HEX_TABLE.__getitem__, data))
+
+
+# Count of bytes for which are the hexdump columns formatted at once
+_HEXDUMP_BLOCK = 4096
+
+
+def _repeated_rows(data, pos, row):
+    """ Return count of continuous rows equal to row in data from pos, compared in growing / shrinking blocks """
+    count = 0
+    step = 1
+    # the compared blocks are limited, so the temporary copies stay small also for a large run
+    max_step = max(1, _HEXDUMP_BLOCK // len(row))
+    while True:
+        block = row * step
+        if data[pos: pos + len(block)] == block:
+            count += step
+            pos += len(block)
+            step = min(step * 2, max_step)
+        elif step > 1:
+            step //= 2
+        else:
+            return count
+
+
+def hexdump_iter(data, start_address=0, compress=True, length=16, sep='.'):
+    """ Generate lines of hex-dump format one by one
+    :param data:          The data array (bytes, bytearray or list of ints) or iterator of continuous bytes chunks,
+                          only an iterator (e.g. generator) is taken as chunks, a list or tuple is the data array
     :param start_address: Absolute Start Address
     :param compress:      Compressed output (remove duplicated content, rows)
     :param length:        Number of Bytes for row (max 16)
-    :param sep:           Is used for non ASCII char
+    :param sep:           Is used for non ASCII char (single Latin-1 char)
     """
-    msg = []
+    if isinstance(data, (bytes, bytearray)):
+        chunks = (data,)
+    elif isinstance(data, Iterator):
+        chunks = data
+    else:
+        # sequence of ints (list, tuple, ...), not a sequence of chunks
+        chunks = (bytes(data),)
+
+    printable = _PRINTABLE_TABLE
+    if sep != '.':
+        printable = bytes(i if 0x20 <= i < 0x7F else ord(sep) for i in range(256))
 
     # The max line length is 16 bytes
     if length > 16:
         length = 16
 
-    # Create header
-    header = '  ADDRESS | '
-    for i in range(0, length):
-        header += "{:02X} ".format(i)
-    header += '| '
-    for i in range(0, length):
-        header += "{:X}".format(i)
-    msg.append(header)
-    msg.append((' ' + '-' * (13 + 4 * length)))
-
-    # Check address align
+    # Create header and row template
+    separator = ' ' + '-' * (13 + 4 * length)
+    row_format = ' {{:08X}} | {{:<{}s}}| {{:s}}'.format(length * 3).format
+    yield '  ADDRESS | ' + ''.join(_HEX_TABLE[:length]) + '| ' + ''.join('{:X}'.format(i) for i in range(length))
+    yield separator
+
+    def format_row(address, substr, offset=0):
+        hexa = '   ' * offset + _hex_column(substr)
+        text = ' ' * offset + substr.translate(printable).decode('latin-1')
+        return row_format(address, hexa, text)
+
+    # Check address align, the first row is shifted right by offset and never compressed
     offset = start_address % length
-    address = start_address - offset
-    align = True if (offset > 0) else False
 
     # Print flags
     prev_line = None
     print_mark = True
 
-    # process data
-    for i in range(0, len(data) + offset, length):
-        hexa = ''
-        if align:
-            substr = data[0: length - offset]
-        else:
-            substr = data[i - offset: i + length - offset]
-            if compress:
-                # compress output string
-                if substr == prev_line:
-                    if print_mark:
-                        print_mark = False
-                        msg.append(' *')
-                    continue
-                else:
-                    prev_line = substr
-                    print_mark = True
-
-        if align:
-            hexa += '   ' * offset
-
-        for h in range(0, len(substr)):
-            h = substr[h]
-            if not isinstance(h, int):
-                h = ord(h)
-            hexa += "{:02X} ".format(h)
-
-        text = ''
-        if align:
-            text += ' ' * offset
-
-        for c in substr:
-            if not isinstance(c, int):
-                c = ord(c)
-            if 0x20 <= c < 0x7F:
-                text += chr(c)
-            else:
-                text += sep
-
-        msg.append((' {:08X} | {:<' + str(length * 3) + 's}| {:s}').format(address + i, hexa, text))
-        align = False
+    # process data, the buffer holds an incomplete row from previous chunk
+    index = 0
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        if offset > 0:
+            if len(buffer) < length - offset:
+                continue
+            yield format_row(start_address - offset, buffer[0: length - offset], offset)
+            pos = length - offset
+            offset = 0
+
+        block_start = block_end = 0
+        while len(buffer) - pos >= length:
+            substr = buffer[pos: pos + length]
+            if compress and substr == prev_line:
+                # compress output string, skip the whole run of duplicated rows at once
+                if print_mark:
+                    print_mark = False
+                    yield ' *'
+                pos += _repeated_rows(buffer, pos, prev_line) * length
+                continue
+
+            prev_line = substr
+            print_mark = True
+            if pos + length > block_end:
+                # format hex and ASCII columns for a block of rows at once, the rows are only sliced from them
+                block_start, block_end = pos, pos + _HEXDUMP_BLOCK
+                hexa = _hex_column(buffer[block_start: block_end])
+                text = buffer[block_start: block_end].translate(printable).decode('latin-1')
+            i = pos - block_start
+            yield row_format(start_address + index + pos, hexa[i * 3: (i + length) * 3], text[i: i + length])
+            pos += length
+
+        buffer = buffer[pos:]
+        index += pos
+
+    if offset > 0:
+        yield format_row(start_address - offset, buffer, offset)
+    elif buffer:
+        yield format_row(start_address + index, buffer)
+
+    yield separator
 
-    msg.append((' ' + '-' * (13 + 4 * length)))
-    return '\n'.join(msg)
 
-
-def size_fmt(num, kibibyte=True):
-    base, suffix = [(1000., 'B'), (1024., 'iB')][kibibyte]
-    for x in ['B'] + [x + suffix for x in list('kMGTP')]:
-        if -base < num < base:
-            break
-        num /= base
-
-    return "{} {}".format(num, x) if x == 'B' else "{:3.1f} {}".format(num, x)
+def hexdump(data, start_address=0, compress=True, length=16, sep='.'):
+    """ Return string in hex-dump format, see hexdump_iter() for parameters """
+    return '\n'.join(hexdump_iter(data, start_address, compress, length, sep))
 
 
 class UInt(click.ParamType):
@@ -158,11 +205,8 @@ class BDKey(click.ParamType):
         else:
             if len(value) < 34:
                 self.fail('Short key, use 32 HEX chars !', param, ctx)
-            value = value[2:]
-            backdoor_key = []
             try:
-                for i in range(0, len(value), 2):
-                    backdoor_key.append(int(value[i:i+2], 16))
+                backdoor_key = list(bytes.fromhex(value[2:]))
             except ValueError:
                 self.fail('Unsupported HEX char in Key !', param, ctx)
 
@@ -176,14 +220,15 @@ class ImgFile(click.ParamType):
 
     def __init__(self, *extensions, exists=False):
         self.exists = exists
-        self.valid_extensions = extensions
+        self.valid_extensions = frozenset(ext.lower() for ext in extensions)
 
     def __repr__(self):
         return 'FILE'
 
     def convert(self, value, param, ctx):
-        if not value.lower().endswith(self.valid_extensions):
-            self.fail('Unsupported file type: *.{} !'.format(value.split('.')[-1]), param, ctx)
+        ext = os.path.splitext(value)[1].lower()
+        if ext not in self.valid_extensions:
+            self.fail('Unsupported file type: *{} !'.format(ext), param, ctx)
 
         if self.exists and not os.path.lexists(value):
             self.fail('File "{}" does not exist !'.format(value), param, ctx)
@@ -213,10 +258,115 @@ MEMS = ['INTERNAL'] + [name for name, _, _ in ExtMemId]
 
 # helper method
 def print_error(message, debug=False):
-    click.echo('\n' + traceback.format_exc() if debug else ' ' + message)
+    if debug:
+        import traceback
+        click.echo('\n' + traceback.format_exc())
+    else:
+        click.echo(' ' + message)
     sys.exit(ERROR_CODE)
 
 
+# helper method
+def echo_lines(lines, buffer_size=0x10000):
+    """ Print lines into stdout, the output is collected in bytearray and written in blocks """
+    stdout = click.get_binary_stream('stdout')
+    encoding = getattr(sys.stdout, 'encoding', None) or 'utf-8'
+    buffer = bytearray()
+    for line in lines:
+        buffer += line.encode(encoding)
+        buffer += b'\n'
+        if len(buffer) >= buffer_size:
+            stdout.write(buffer)
+            del buffer[:]
+    stdout.write(buffer)
+    stdout.flush()
+
+
+# helper method
+def save_data(file, data, address, record_size=32):
+    """ Save data into file, the SREC and iHEX records are packed and written one by one instead of whole string
+    :param file:        The file name with ext.: *.bin, *.hex, *.ihex, *.srec or *.s19
+    :param data:        The data array of bytes
+    :param address:     The start address of data
+    :param record_size: The count of data bytes in one record
+    """
+    ext = os.path.splitext(file)[1].lower()
+    if ext not in ('.srec', '.s19', '.hex', '.ihex'):
+        with open(file, 'wb') as f:
+            f.write(data)
+        return
+
+    from bincopy import pack_srec, pack_ihex
+    data = memoryview(data)
+    with open(file, 'w', buffering=0x100000) as f:
+        write = f.write
+        if ext in ('.srec', '.s19'):
+            # same records as bincopy.BinFile.as_srec() with 'mboot' header
+            write(pack_srec('0', 0, 5, b'mboot') + '\n')
+            count = 0
+            for offset in range(0, len(data), record_size):
+                record = data[offset: offset + record_size]
+                write(pack_srec('3', address + offset, len(record), record) + '\n')
+                count += 1
+            if count > 0xFFFFFF:
+                raise ValueError(f'too many records {count}')
+            write(pack_srec('5' if count <= 0xFFFF else '6', count, 0, None) + '\n')
+        else:
+            # same records as bincopy.BinFile.as_ihex(), the extended linear address is written when changed
+            linear_address = 0
+            for offset in range(0, len(data), record_size):
+                record = data[offset: offset + record_size]
+                record_address = address + offset
+                if record_address >> 16 > linear_address:
+                    linear_address = record_address >> 16
+                    write(pack_ihex(4, 0, 2, linear_address.to_bytes(2, 'big')) + '\n')
+                write(pack_ihex(0, record_address & 0xFFFF, len(record), record) + '\n')
+            write(pack_ihex(1, 0, 0, None) + '\n')
+
+
+# helper method
+def iter_in_thread(iterator, maxsize=4):
+    """ Run the iterator in a background thread and yield its items, exceptions are re-raised in caller.
+    The thread is stopped between items and joined when the generator is closed.
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def producer():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+        else:
+            put(done)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    try:
+        thread.start()
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
 # helper method
 def scan_interface(device_name):
     # Scan for connected devices
@@ -241,6 +391,20 @@ def scan_interface(device_name):
         print_error("Device not connected !\n")
 
 
+# helper method
+@contextmanager
+def mboot_session(ctx):
+    """ Connect to device for one command, the exceptions are printed by print_error() """
+    device = scan_interface(ctx.obj['TARGET'])
+
+    try:
+        with McuBoot(device, True) as mb:
+            yield mb
+
+    except Exception as e:
+        print_error(str(e), ctx.obj['DEBUG'])
+
+
 # McuBoot: base options
 @click.group(context_settings=dict(help_option_names=['-?', '--help']), help=DESCRIP)
 @click.option('-t', '--target', type=click.STRING, default=None, help='Select target MKL27, LPC55, ... [optional]')
@@ -266,24 +430,20 @@ def cli(ctx, target, debug):
 def info(ctx):
 
     properties = []
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            properties = mb.get_property_list()
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        properties = mb.get_property_list()
 
     if ctx.obj['DEBUG']:
         click.echo()
 
+    lines = []
     for p in properties:
         v = p.to_str()
         if isinstance(v, list):
-            click.echo(f" {p.name}:" + "".join([f"\n  - {s}" for s in v]))
+            lines.append(f" {p.name}:" + "".join([f"\n  - {s}" for s in v]))
         else:
-            click.echo(f" {p.name}: {v}")
+            lines.append(f" {p.name}: {v}")
+    click.echo('\n'.join(lines))
 
 
 # McuBoot: print memories list command
@@ -292,44 +452,38 @@ def info(ctx):
 def mlist(ctx):
 
     mem_list = {}
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mem_list = mb.get_memory_list()
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mem_list = mb.get_memory_list()
 
     if ctx.obj['DEBUG']:
         click.echo()
 
-    message = ''
+    parts = []
     for key, values in mem_list.items():
-        message += " {}:\n".format(key.title().replace('_', ' '))
+        parts.append(" {}:\n".format(key.title().replace('_', ' ')))
         if key in ('internal_ram', 'internal_flash'):
             for i, item in values.items():
-                message += "  {}) 0x{:08X} - 0x{:08X}, Size: {}".format(
-                    i, item['address'], item['address'] + item['size'], size_fmt(item['size']))
+                parts.append("  {}) 0x{:08X} - 0x{:08X}, Size: {}".format(
+                    i, item['address'], item['address'] + item['size'], size_fmt(item['size'])))
                 if 'sector_size' in item:
-                    message += ", Sector Size: {}".format(size_fmt(item['sector_size']))
-                message += '\n'
+                    parts.append(", Sector Size: {}".format(size_fmt(item['sector_size'])))
+                parts.append('\n')
         else:
             for i, attr in enumerate(values):
-                message += "  {}) {}:\n".format(i, attr['mem_name'])
+                parts.append("  {}) {}:\n".format(i, attr['mem_name']))
                 if 'address' in attr:
-                    message += "     Start Address: 0x{:08X}\n".format(attr['address'])
+                    parts.append("     Start Address: 0x{:08X}\n".format(attr['address']))
                 if 'size' in attr:
-                    message += "     Memory Size:   {} ({} B)\n".format(size_fmt(attr['size']), attr['size'])
+                    parts.append("     Memory Size:   {} ({} B)\n".format(size_fmt(attr['size']), attr['size']))
                 if 'page_size' in attr:
-                    message += "     Page Size:     {}\n".format(attr['page_size'])
+                    parts.append("     Page Size:     {}\n".format(attr['page_size']))
                 if 'sector_size' in attr:
-                    message += "     Sector Size:   {}\n".format(attr['sector_size'])
+                    parts.append("     Sector Size:   {}\n".format(attr['sector_size']))
                 if 'block_size' in attr:
-                    message += "     Block Size:    {}\n".format(attr['block_size'])
-        message += '\n'
+                    parts.append("     Block Size:    {}\n".format(attr['block_size']))
+        parts.append('\n')
 
-    click.echo(message)
+    click.echo(''.join(parts))
 
 
 # McuBoot: configure external memory command
@@ -358,24 +512,18 @@ def mconf(ctx, address, word, mtype, file):
     if not memory_data:
         print_error('The argument -w/--word or -f/--file must be specified !')
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            if address is None:
-                # get internal memory start address and size
-                memory_address = mb.get_property(PropertyTag.RAM_START_ADDRESS)[0]
-                memory_size = mb.get_property(PropertyTag.RAM_SIZE)[0]
-                # calculate address
-                address = memory_address + memory_size - len(memory_data)
-                # add additional offset 1024 Bytes
-                address -= 1024
+    with mboot_session(ctx) as mb:
+        if address is None:
+            # get internal memory start address and size
+            memory_address = mb.get_property(PropertyTag.RAM_START_ADDRESS)[0]
+            memory_size = mb.get_property(PropertyTag.RAM_SIZE)[0]
+            # calculate address
+            address = memory_address + memory_size - len(memory_data)
+            # add additional offset 1024 Bytes
+            address -= 1024
 
-            mb.write_memory(address, memory_data)
-            mb.configure_memory(memory_id, address)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+        mb.write_memory(address, memory_data)
+        mb.configure_memory(memory_id, address)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -383,21 +531,19 @@ def mconf(ctx, address, word, mtype, file):
 
 # McuBoot: receive SB file command
 @cli.command(short_help="Receive SB file")
-@click.argument('file', nargs=1, type=ImgFile(('.bin', '.sb', '.sb2'), True))
+@click.argument('file', nargs=1, type=ImgFile('.bin', '.sb', '.sb2', exists=True))
 @click.pass_context
 def sbfile(ctx, file):
 
-    device = scan_interface(ctx.obj['TARGET'])
+    # empty file can't be memory-mapped and has nothing to send
+    if os.path.getsize(file) == 0:
+        print_error(f'The SB file is empty: {file} !')
 
-    with open(file, 'rb') as f:
-        sb_data = f.read()
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.receive_sb_file(sb_data)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        # the file is memory-mapped, data are sent directly from page cache without a copy in RAM
+        with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as sb_file:
+            with memoryview(sb_file) as sb_data:
+                mb.receive_sb_file(sb_data)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -415,49 +561,46 @@ def sbfile(ctx, file):
 def write(ctx, address, offset, mtype, erase, verify, file):
 
     mem_id = 0 if mtype == 'INTERNAL' else ExtMemId[mtype]
-    in_data = bincopy.BinFile()
 
     try:
-        if file.lower().endswith(('.srec', '.s19')):
-            in_data.add_srec_file(file)
-            if address is None:
-                address = in_data.minimum_address
-        elif file.lower().endswith(('.hex', '.ihex')):
-            in_data.add_ihex_file(file)
+        if file.lower().endswith(('.srec', '.s19', '.hex', '.ihex')):
+            import bincopy
+            in_data = bincopy.BinFile()
+            if file.lower().endswith(('.srec', '.s19')):
+                in_data.add_srec_file(file)
+            else:
+                in_data.add_ihex_file(file)
             if address is None:
                 address = in_data.minimum_address
+            data = in_data.as_binary()
         else:
-            in_data.add_binary_file(file)
+            # raw binary doesn't need to pass through bincopy segments
+            with open(file, 'rb') as f:
+                data = f.read()
             if address is None:
                 address = 0
 
-        data = in_data.as_binary()
     except Exception as e:
         print_error(f"Could not read from file: {file} \n [{str(e)}]")
         raise
 
     if offset < len(data):
-        data = data[offset:]
-
-    device = scan_interface(ctx.obj['TARGET'])
-    click.echo(' Writing into MCU memory, please wait !\n')
-
-    try:
-        with McuBoot(device, True) as mb:
-            # Read Flash Sector Size of connected MCU
-            flash_sector_size = mb.get_property(PropertyTag.FLASH_SECTOR_SIZE, mem_id)[0]
-            # Align Erase Start Address and Len to Flash Sector Size
-            start_address = (address & ~(flash_sector_size - 1))
-            length = (len(data) & ~(flash_sector_size - 1))
-            if (len(data) % flash_sector_size) > 0:
-                length += flash_sector_size
-            # Erase specified region in MCU Flash memory
-            mb.flash_erase_region(start_address, length, mem_id)
-            # Write data into MCU Flash memory
-            mb.write_memory(address, data, mem_id)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+        # skip the offset without copying the image data
+        data = memoryview(data)[offset:]
+
+    with mboot_session(ctx) as mb:
+        click.echo(' Writing into MCU memory, please wait !\n')
+        # Read Flash Sector Size of connected MCU
+        flash_sector_size = mb.get_property(PropertyTag.FLASH_SECTOR_SIZE, mem_id)[0]
+        # Align Erase Start Address and Len to Flash Sector Size
+        start_address = (address & ~(flash_sector_size - 1))
+        length = (len(data) & ~(flash_sector_size - 1))
+        if (len(data) % flash_sector_size) > 0:
+            length += flash_sector_size
+        # Erase specified region in MCU Flash memory
+        mb.flash_erase_region(start_address, length, mem_id)
+        # Write data into MCU Flash memory
+        mb.write_memory(address, data, mem_id)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -471,44 +614,30 @@ def write(ctx, address, offset, mtype, erase, verify, file):
 @click.option('-c', '--compress', is_flag=True, show_default=True, help='Compress dump output.')
 @click.option('-f', '--file', type=ImgFile('.bin', '.hex', '.ihex',  '.s19', '.srec'),
               help='Output file name with ext.: *.bin, *.hex, *.ihex, *.srec or *.s19')
+@click.option('-s', '--chunk', type=UInt(min=1), default=0x10000, help='Bytes count read by one command '
+                                                                         '(default: 0x10000).')
 @click.argument('address', type=UInt())
 @click.argument('length',  type=UInt())
 @click.pass_context
-def read(ctx, address, length, mtype, compress, file):
+def read(ctx, address, length, mtype, compress, file, chunk):
 
     mem_id = 0 if mtype == 'INTERNAL' else ExtMemId[mtype]
-    device = scan_interface(ctx.obj['TARGET'])
 
-    click.echo(" Reading from MCU memory, please wait ! \n")
-
-    try:
-        with McuBoot(device, True) as mb:
-            data = mb.read_memory(address, length, mem_id)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        click.echo(" Reading from MCU memory, please wait ! \n")
+        # USB reading runs in background and overlaps with output processing, it's stopped before closing device
+        with closing(iter_in_thread(mb.read_memory_iter(address, length, mem_id, chunk))) as chunks:
+            if file is None:
+                echo_lines(hexdump_iter(chunks, address, compress))
+            else:
+                data = b''.join(chunks)
 
     if ctx.obj['DEBUG']:
         click.echo()
 
-    if file is None:
-        click.echo(hexdump(data, address, compress))
-    else:
+    if file is not None:
         try:
-            if file.lower().endswith(('.srec', '.s19')):
-                srec = bincopy.BinFile()
-                srec.add_binary(data, address)
-                srec.header = 'mboot'
-                with open(file, "w") as f:
-                    f.write(srec.as_srec())
-            elif file.lower().endswith(('.hex', '.ihex')):
-                ihex = bincopy.BinFile()
-                ihex.add_binary(data, address)
-                with open(file, "w") as f:
-                    f.write(ihex.as_ihex())
-            else:
-                with open(file, "wb") as f:
-                    f.write(data)
+            save_data(file, data, address)
         except Exception as e:
             print_error(f"Could not write to file: {file} \n [{str(e)}]")
 
@@ -525,26 +654,20 @@ def read(ctx, address, length, mtype, compress, file):
 def erase(ctx, address, length, mass, mtype):
 
     mem_id = 0 if mtype == 'INTERNAL' else ExtMemId[mtype]
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            if mass:
-                values = mb.get_property(PropertyTag.AVAILABLE_COMMANDS)
-                commands = parse_property_value(PropertyTag.AVAILABLE_COMMANDS, values)
-                if CommandTag.FLASH_ERASE_ALL_UNSECURE in commands:
-                    mb.flash_erase_all_unsecure()
-                elif CommandTag.FLASH_ERASE_ALL in commands:
-                    mb.flash_erase_all(mem_id)
-                else:
-                    raise Exception('Not Supported Command')
+    with mboot_session(ctx) as mb:
+        if mass:
+            values = mb.get_property(PropertyTag.AVAILABLE_COMMANDS)
+            commands = parse_property_value(PropertyTag.AVAILABLE_COMMANDS, values)
+            if CommandTag.FLASH_ERASE_ALL_UNSECURE in commands:
+                mb.flash_erase_all_unsecure()
+            elif CommandTag.FLASH_ERASE_ALL in commands:
+                mb.flash_erase_all(mem_id)
             else:
-                if address is None or length is None:
-                    raise Exception("Argument \"-a, --address\" and \"-l, --length\" must be defined !")
-                mb.flash_erase_region(address, length, mem_id)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+                raise Exception('Not Supported Command')
+        else:
+            if address is None or length is None:
+                raise Exception("Argument \"-a, --address\" and \"-l, --length\" must be defined !")
+            mb.flash_erase_region(address, length, mem_id)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -560,16 +683,10 @@ def erase(ctx, address, length, mass, mtype):
 def efuse(ctx, index, value):
 
     read_value = 0
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            if value is not None:
-                mb.efuse_program_once(index, value)
-            read_value = mb.efuse_read_once(index)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        if value is not None:
+            mb.efuse_program_once(index, value)
+        read_value = mb.efuse_read_once(index)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -587,15 +704,9 @@ def otp(ctx, length, address, data):
 
     print_error("ERROR: 'otp' command is not implemented yet")
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            # TODO: write implementation
-            pass
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        # TODO: write implementation
+        pass
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -612,36 +723,17 @@ def otp(ctx, length, address, data):
 @click.pass_context
 def resource(ctx, address, length, option, compress, file):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            data = mb.flash_read_resource(address, length, option)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        data = mb.flash_read_resource(address, length, option)
 
     if ctx.obj['DEBUG']:
         click.echo()
 
     if file is None:
-        click.echo(hexdump(data, address, compress))
+        echo_lines(hexdump_iter(data, address, compress))
     else:
         try:
-            if file.lower().endswith(('.srec', '.s19')):
-                srec = bincopy.BinFile()
-                srec.add_binary(data, address)
-                srec.header = 'mboot'
-                with open(file, "w") as f:
-                    f.write(srec.as_srec())
-            elif file.lower().endswith(('.hex', '.ihex')):
-                ihex = bincopy.BinFile()
-                ihex.add_binary(data, address)
-                with open(file, "w") as f:
-                    f.write(ihex.as_ihex())
-            else:
-                with open(file, "wb") as f:
-                    f.write(data)
+            save_data(file, data, address)
         except Exception as e:
             print_error(f'Could not write to file: {file} \n [{str(e)}]')
 
@@ -654,17 +746,11 @@ def resource(ctx, address, length, option, compress, file):
 @click.pass_context
 def unlock(ctx, key):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            if key is None:
-                mb.flash_erase_all_unsecure()
-            else:
-                mb.flash_security_disable(key)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        if key is None:
+            mb.flash_erase_all_unsecure()
+        else:
+            mb.flash_security_disable(key)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -680,14 +766,8 @@ def unlock(ctx, key):
 @click.pass_context
 def fill(ctx, address, length, pattern):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.fill_memory(address, length, pattern)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.fill_memory(address, length, pattern)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -701,14 +781,8 @@ def fill(ctx, address, length, pattern):
 @click.pass_context
 def update(ctx, address):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.reliable_update(address)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.reliable_update(address)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -721,14 +795,8 @@ def update(ctx, address):
 @click.pass_context
 def call(ctx, address, argument):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.call(address, argument)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.call(address, argument)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -744,14 +812,8 @@ def call(ctx, address, argument):
 @click.pass_context
 def execute(ctx, address, argument, stackpointer):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.execute(address, argument, stackpointer)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.execute(address, argument, stackpointer)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -764,14 +826,8 @@ def execute(ctx, address, argument, stackpointer):
 @click.pass_context
 def reset(ctx):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.reset(reopen=False)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.reset(reopen=False)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -787,17 +843,11 @@ def reset(ctx):
 @click.pass_context
 def keyblob(ctx, count, dekfile, blobfile):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
     with open(dekfile, "rb") as f:
         dek_data = f.read()
 
-    try:
-        with McuBoot(device, True) as mb:
-            blob_data = mb.generate_key_blob(dek_data, count)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        blob_data = mb.generate_key_blob(dek_data, count)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -812,14 +862,8 @@ def keyblob(ctx, count, dekfile, blobfile):
 @click.pass_context
 def kp_enroll(ctx):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.kp_enroll()
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.kp_enroll()
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -832,14 +876,8 @@ def kp_enroll(ctx):
 @click.pass_context
 def kp_gen_key(ctx, key_type, key_size):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.kp_set_intrinsic_key(key_type, key_size)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.kp_set_intrinsic_key(key_type, key_size)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -852,17 +890,11 @@ def kp_gen_key(ctx, key_type, key_size):
 @click.pass_context
 def kp_user_key(ctx, key_type, file):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
     with open(file, "rb") as f:
         key_data = f.read()
 
-    try:
-        with McuBoot(device, True) as mb:
-            mb.kp_set_user_key(key_type, key_data)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.kp_set_user_key(key_type, key_data)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -874,14 +906,8 @@ def kp_user_key(ctx, key_type, file):
 @click.pass_context
 def kp_write_nvm(ctx, memid):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.kp_write_nonvolatile(memid)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.kp_write_nonvolatile(memid)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -893,14 +919,8 @@ def kp_write_nvm(ctx, memid):
 @click.pass_context
 def kp_read_nvm(ctx, memid):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            mb.kp_read_nonvolatile(memid)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.kp_read_nonvolatile(memid)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -913,17 +933,11 @@ def kp_read_nvm(ctx, memid):
 @click.pass_context
 def kp_write_kstore(ctx, key_type, file):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
     with open(file, "rb") as f:
         key_data = f.read()
 
-    try:
-        with McuBoot(device, True) as mb:
-            mb.kp_write_key_store(key_type, key_data)
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        mb.kp_write_key_store(key_type, key_data)
 
     if ctx.obj['DEBUG']:
         click.echo()
@@ -935,14 +949,8 @@ def kp_write_kstore(ctx, key_type, file):
 @click.pass_context
 def kp_read_kstore(ctx, file):
 
-    device = scan_interface(ctx.obj['TARGET'])
-
-    try:
-        with McuBoot(device, True) as mb:
-            key_data = mb.kp_read_key_store()
-
-    except Exception as e:
-        print_error(str(e), ctx.obj['DEBUG'])
+    with mboot_session(ctx) as mb:
+        key_data = mb.kp_read_key_store()
 
     if ctx.obj['DEBUG']:
         click.echo()
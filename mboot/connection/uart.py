@@ -147,7 +147,7 @@ class Uart(DevConnBase):
         """
         if isinstance(packet, CmdPacket):
             uart_packet = UartPacket(FPT.CMD, packet.to_bytes())
-        elif isinstance(packet, (bytes, bytearray)):
+        elif isinstance(packet, (bytes, bytearray, memoryview)):
             uart_packet = UartPacket(FPT.DATA, packet)
         else:
             raise Exception()
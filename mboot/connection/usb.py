@@ -40,21 +40,18 @@ def scan_usb(device_name: str = None) -> list:
 
     :param device_name: The specific device name (MKL27, LPC55, ...) or VID:PID
     """
-    devices = []
-
     if device_name is None:
-        for name, value in USB_DEVICES.items():
-            devices += RawHid.enumerate(value[0], value[1])
+        ids = list(USB_DEVICES.values())
+    elif ':' in device_name:
+        vid, pid = device_name.split(':')
+        ids = [(int(vid, 0), int(pid, 0))]
+    elif device_name in USB_DEVICES:
+        ids = [USB_DEVICES[device_name]]
     else:
-        if ':' in device_name:
-            vid, pid = device_name.split(':')
-            devices = RawHid.enumerate(int(vid, 0), int(pid, 0))
-        else:
-            if device_name in USB_DEVICES:
-                vid = USB_DEVICES[device_name][0]
-                pid = USB_DEVICES[device_name][1]
-                devices = RawHid.enumerate(vid, pid)
-    return devices
+        return []
+
+    # Enumerate the bus only once for all requested VID:PID pairs
+    return RawHid.enumerate_ids(ids)
 
 
 ########################################################################################################################
@@ -87,15 +84,16 @@ class RawHidBase(DevConnBase):
     @staticmethod
     def _encode_report(report_id, report_size, data, offset=0):
         data_len = min(len(data) - offset, report_size - 4)
-        raw_data = pack('<2BH', report_id, 0x00, data_len)
-        raw_data += data[offset: offset + data_len]
-        raw_data += bytes([0x00] * (report_size - len(raw_data)))
-        logger.debug(f"OUT[{len(raw_data)}]: " + ' '.join(f"{b:02X}" for b in raw_data))
+        raw_data = b''.join((pack('<2BH', report_id, 0x00, data_len), data[offset: offset + data_len],
+                             bytes(report_size - 4 - data_len)))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"OUT[{len(raw_data)}]: " + ' '.join(f"{b:02X}" for b in raw_data))
         return raw_data, offset + data_len
 
     @staticmethod
     def _decode_report(raw_data):
-        logger.debug(f"IN [{len(raw_data)}]: " + ' '.join(f"{b:02X}" for b in raw_data))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"IN [{len(raw_data)}]: " + ' '.join(f"{b:02X}" for b in raw_data))
         report_id, _, plen = unpack_from('<2BH', raw_data)
         data = bytes(raw_data[4: 4 + plen])
         if report_id == REPORT_ID['CMD_IN']:
@@ -176,17 +174,21 @@ if os.name == "nt":
             if isinstance(packet, CmdPacket):
                 report_id = REPORT_ID['CMD_OUT']
                 data = packet.to_bytes()
-            elif isinstance(packet, (bytes, bytearray)):
+            elif isinstance(packet, (bytes, bytearray, memoryview)):
                 report_id = REPORT_ID['DATA_OUT']
                 data = packet
             else:
                 raise Exception()
 
             data_index = 0
-            report_size = self.report[report_id - 1]._HidReport__raw_report_size
-            while data_index < len(data):
-                raw_data, data_index = self._encode_report(report_id, report_size, data, data_index)
-                self.report[report_id - 1].send(raw_data)
+            data_len = len(data)
+            encode_report = self._encode_report
+            report = self.report[report_id - 1]
+            report_size = report._HidReport__raw_report_size
+            send = report.send
+            while data_index < data_len:
+                raw_data, data_index = encode_report(report_id, report_size, data, data_index)
+                send(raw_data)
 
         def read(self, timeout=2000):
             """
@@ -210,13 +212,22 @@ if os.name == "nt":
             :param vid: USB Vendor ID
             :param pid: USB Product ID
             """
+            return RawHid.enumerate_ids([(vid, pid)])
+
+        @staticmethod
+        def enumerate_ids(ids):
+            """
+            Get an array of all connected devices which matches any of PyWinUSB.vid/PyWinUSB.pid pairs.
+
+            :param ids: List of (USB Vendor ID, USB Product ID) tuples
+            """
 
             targets = []
             all_devices = hid.find_all_hid_devices()
 
             # find devices with good vid/pid
             for dev in all_devices:
-                if (dev.vendor_id == vid) and (dev.product_id == pid):
+                if (dev.vendor_id, dev.product_id) in ids:
                     try:
                         dev.open(shared=False)
                         report = dev.find_output_reports()
@@ -286,18 +297,21 @@ else:
             if isinstance(packet, CmdPacket):
                 report_id = REPORT_ID['CMD_OUT']
                 data = packet.to_bytes()
-            elif isinstance(packet, (bytes, bytearray)):
+            elif isinstance(packet, (bytes, bytearray, memoryview)):
                 report_id = REPORT_ID['DATA_OUT']
                 data = packet
             else:
                 raise Exception()
 
             data_index = 0
+            data_len = len(data)
+            encode_report = self._encode_report
             if self.ep_out:
                 report_size = self.ep_out.wMaxPacketSize
-                while data_index < len(data):
-                    raw_data, data_index = self._encode_report(report_id, report_size, data, data_index)
-                    self.ep_out.write(raw_data)
+                ep_write = self.ep_out.write
+                while data_index < data_len:
+                    raw_data, data_index = encode_report(report_id, report_size, data, data_index)
+                    ep_write(raw_data)
 
             else:
                 bmRequestType = 0x21            # Host to device request of type Class of Recipient Interface
@@ -305,9 +319,10 @@ else:
                 wValue = 0x200 + report_id      # Issuing an OUT report with specified ID
                 wIndex = self.interface_number  # Interface number for HID
                 report_size = 36                # TODO: get the value from descriptor
-                while data_index < len(data):
-                    raw_data, data_index = self._encode_report(report_id, report_size, data, data_index)
-                    self.device.ctrl_transfer(bmRequestType, bmRequest, wValue, wIndex, raw_data)
+                ctrl_transfer = self.device.ctrl_transfer
+                while data_index < data_len:
+                    raw_data, data_index = encode_report(report_id, report_size, data, data_index)
+                    ctrl_transfer(bmRequestType, bmRequest, wValue, wIndex, raw_data)
 
         def read(self, timeout=1000):
             """
@@ -327,12 +342,17 @@ else:
             :param vid: USB Vendor ID
             :param pid: USB Product ID
             """
-            # find all devices matching the vid/pid specified
-            all_devices = usb.core.find(find_all=True, idVendor=vid, idProduct=pid)
+            return RawHid.enumerate_ids([(vid, pid)])
 
-            if not all_devices:
-                logger.debug("No device connected")
-                return None
+        @staticmethod
+        def enumerate_ids(ids):
+            """
+            Get list of all connected devices which matches any of PyUSB.vid and PyUSB.pid pairs.
+
+            :param ids: List of (USB Vendor ID, USB Product ID) tuples
+            """
+            # find all devices matching the vid/pid specified
+            all_devices = usb.core.find(find_all=True, custom_match=lambda d: (d.idVendor, d.idProduct) in ids)
 
             targets = []
 
@@ -374,14 +394,14 @@ else:
 
                 if not ep_in:
                     logger.error('Endpoints not found')
-                    return None
+                    continue
 
                 new_target = RawHid()
                 new_target.ep_in = ep_in
                 new_target.ep_out = ep_out
                 new_target.device = dev
-                new_target.vid = vid
-                new_target.pid = pid
+                new_target.vid = dev.idVendor
+                new_target.pid = dev.idProduct
                 new_target.interface_number = interface_number
                 new_target.vendor_name = usb.util.get_string(dev, 1).strip('\0')
                 new_target.product_name = usb.util.get_string(dev, 2).strip('\0')
@@ -145,15 +145,16 @@ class McuBoot:
         :param length:
         :param timeout:
         """
-        data = b''
+        data = bytearray()
 
         if not self._device.is_opened:
             logger.info('RX: Device not opened')
             raise McuBootConnectionError('Device not opened')
 
+        device_read = self._device.read
         while True:
             try:
-                response = self._device.read(timeout)
+                response = device_read(timeout)
             except TimeoutError:
                 self._status_code = StatusCode.NO_RESPONSE
                 logger.debug('RX: No Response, Timeout Error !')
@@ -175,7 +176,7 @@ class McuBoot:
         else:
             logger.info(f"CMD: Successfully Received {len(data)} from {length} Bytes")
 
-        return data[:length] if len(data) > length else data
+        return bytes(memoryview(data)[:length])
 
     def _send_data(self, cmd_tag: int, data: bytes) -> bool:
         """
@@ -409,6 +410,30 @@ class McuBoot:
             return self._read_data(CommandTag.READ_MEMORY, cmd_response.length)
         return None
 
+    def read_memory_iter(self, address: int, length: int, mem_id: int = 0, chunk_size: int = 0x10000):
+        """
+        Read data from MCU memory in chunks (generator of bytes)
+
+        :param address: Start address
+        :param length: Count of bytes
+        :param mem_id: Memory ID
+        :param chunk_size: Max count of bytes read by one command (chunks are aligned to this size)
+        :raise McuBootCommandError: If reading of a chunk failed
+        :raise McuBootConnectionError: If a chunk was received incomplete
+        """
+        read_memory = self.read_memory
+        end_address = address + length
+        while address < end_address:
+            size = min(chunk_size - address % chunk_size, end_address - address)
+            data = read_memory(address, size, mem_id)
+            # the caller must not get truncated data silently, also without cmd_exception
+            if self.status_code != StatusCode.SUCCESS:
+                raise McuBootCommandError(CommandTag[CommandTag.READ_MEMORY], self.status_code)
+            if data is None or len(data) < size:
+                raise McuBootConnectionError(f"Received {len(data or b'')} from {size} Bytes at 0x{address:08X}")
+            yield data
+            address += size
+
     def write_memory(self, address: int, data: bytes, mem_id: int = 0) -> bool:
         """
         Write data into MCU memory
@@ -480,7 +505,7 @@ class McuBoot:
         """
         Receive SB file
 
-        :param  data: SB file data
+        :param  data: SB file data (bytes-like object, e.g. memoryview of mapped file)
         """
         logger.info(f"CMD: ReceiveSBfile(data_length={len(data)})")
         cmd_packet = CmdPacket(CommandTag.RECEIVE_SB_FILE, 1, len(data))
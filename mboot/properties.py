@@ -16,6 +16,9 @@ from .errorcodes import StatusCode
 ########################################################################################################################
 # McuBoot helper functions
 ########################################################################################################################
+_SIZE_PREFIXES = ('k', 'M', 'G', 'T', 'P')
+
+
 def size_fmt(value: Union[int, float], kibibyte: bool = True) -> str:
     """
     Convert size value into string format
@@ -23,13 +26,16 @@ def size_fmt(value: Union[int, float], kibibyte: bool = True) -> str:
     :param value: The raw value
     :param kibibyte: True if 1024 Bytes represent 1kB or False if 1000 Bytes represent 1kB
     """
-    base, suffix = [(1000., 'B'), (1024., 'iB')][kibibyte]
-    for x in ['B'] + [x + suffix for x in list('kMGTP')]:
-        if -base < value < base:
-            break
-        value /= base
-
-    return "{} {}".format(value, x) if x == 'B' else "{:3.1f} {}".format(value, x)
+    # exponent is given by bit length or digits count of the integer part, without dividing in loop
+    integer = abs(int(value))
+    if kibibyte:
+        base, exp = 1024, (integer.bit_length() - 1) // 10
+    else:
+        base, exp = 1000, (len(str(integer)) - 1) // 3
+    if exp <= 0:
+        return "{} B".format(value)
+    exp = min(exp, len(_SIZE_PREFIXES))
+    return "{:3.1f} {}{}".format(value / base ** exp, _SIZE_PREFIXES[exp - 1], 'iB' if kibibyte else 'B')
 
 
 ########################################################################################################################
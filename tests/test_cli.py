@@ -0,0 +1,191 @@
+# Copyright (c) 2019 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+
+import click
+import pytest
+import threading
+from click.testing import CliRunner
+from mboot import __main__ as mboot_cli
+from mboot.__main__ import hexdump, hexdump_iter, iter_in_thread, save_data, BDKey, ImgFile
+from test_mcuboot import VirtualDevice
+
+
+HEADER = (
+    "  ADDRESS | 00 01 02 03 04 05 06 07 08 09 0A 0B 0C 0D 0E 0F | 0123456789ABCDEF\n"
+    " -----------------------------------------------------------------------------\n"
+)
+FOOTER = " -----------------------------------------------------------------------------"
+
+
+def test_hexdump():
+    data = b'Hello World!\x00\x01\x02\x03ABCD'
+    dump = hexdump(data, 0x1004)
+    assert dump == HEADER + (
+        " 00001000 |             48 65 6C 6C 6F 20 57 6F 72 6C 64 21 |     Hello World!\n"
+        " 00001010 | 00 01 02 03 41 42 43 44                         | ....ABCD\n"
+    ) + FOOTER
+    assert hexdump(list(data), 0x1004) == dump
+    assert hexdump(bytearray(data), 0x1004) == dump
+    assert list(hexdump_iter(data, 0x1004)) == dump.split('\n')
+
+
+def test_hexdump_sep():
+    dump = hexdump(b'\x00A\xFF', sep='#')
+    assert dump == HEADER + (
+        " 00000000 | 00 41 FF                                        | #A#\n"
+    ) + FOOTER
+
+
+def test_hexdump_compress():
+    data = b'\xFF' * 64 + b'\x00' * 16
+    assert hexdump(data, 0x100) == HEADER + (
+        " 00000100 | FF FF FF FF FF FF FF FF FF FF FF FF FF FF FF FF | ................\n"
+        " *\n"
+        " 00000140 | 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 | ................\n"
+    ) + FOOTER
+    assert hexdump(data, 0x100, False).count('\n') == 5 + 2
+    data = b'\xFF' * 0x10000 + b'\x00' * 0x1008 + b'\xFF' * 0x10
+    dump = hexdump(data, 0x104)
+    assert dump.count(' *') == 2
+    assert list(hexdump_iter(iter([data[i: i + 0x300] for i in range(0, len(data), 0x300)]), 0x104)) == dump.split('\n')
+
+
+def test_iter_in_thread():
+    assert list(iter_in_thread(iter(range(10)))) == list(range(10))
+    with pytest.raises(ValueError):
+        list(iter_in_thread(int(c) for c in '12x'))
+    # the producer is stopped and joined when the consumer stops early
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    threads = threading.active_count()
+    items = iter_in_thread(source(), 2)
+    assert next(items) == 0
+    items.close()
+    assert threading.active_count() == threads
+    assert len(produced) < 100
+
+
+def test_bdkey():
+    bdkey = BDKey()
+    assert bdkey.convert('X:0102030405060708090A0B0C0D0E0Fff', None, None) == list(range(1, 16)) + [0xFF]
+    assert bdkey.convert('S:0123456789ABCDEF', None, None) == [ord(c) for c in '0123456789ABCDEF']
+    with pytest.raises(click.BadParameter):
+        bdkey.convert('X:010203040506070809', None, None)
+    with pytest.raises(click.BadParameter):
+        bdkey.convert('X:0102030405060708090A0B0C0D0E0FGG', None, None)
+
+
+def test_img_file(tmpdir):
+    img_file = ImgFile('.bin', '.HEX')
+    assert img_file.convert('image.BIN', None, None) == 'image.BIN'
+    assert img_file.convert('dir.v1/image.hex', None, None) == 'dir.v1/image.hex'
+    with pytest.raises(click.BadParameter):
+        img_file.convert('image.srec', None, None)
+    with pytest.raises(click.BadParameter):
+        img_file.convert('image', None, None)
+    with pytest.raises(click.BadParameter):
+        ImgFile('.bin', exists=True).convert(str(tmpdir.join('image.bin')), None, None)
+
+
+@pytest.mark.parametrize('ext', ['.bin', '.hex', '.srec'])
+def test_save_data(tmpdir, ext):
+    import bincopy
+    data = bytes(range(256)) * 0x210
+    image = bincopy.BinFile()
+    image.add_binary(data, 0xFFF4)
+    image.header = 'mboot'
+    out_file = tmpdir.join('dump' + ext)
+    save_data(str(out_file), data, 0xFFF4)
+    if ext == '.bin':
+        assert out_file.read_binary() == data
+    else:
+        assert out_file.read() == (image.as_ihex() if ext == '.hex' else image.as_srec())
+
+
+def test_read_command(monkeypatch, tmpdir):
+    memory = bytes(range(256)) * 16
+    monkeypatch.setattr(mboot_cli, 'scan_usb', lambda name: [VirtualDevice(memory=memory)])
+    runner = CliRunner()
+    result = runner.invoke(mboot_cli.cli, ['read', '--chunk', '0x100', '0x104', '0x200'], obj={})
+    assert result.exit_code == 0
+    assert hexdump(memory[0x104: 0x304], 0x104, False) in result.output
+    out_file = str(tmpdir.join('dump.bin'))
+    result = runner.invoke(mboot_cli.cli, ['read', '-f', out_file, '0x104', '0x200'], obj={})
+    assert result.exit_code == 0
+    with open(out_file, 'rb') as f:
+        assert f.read() == memory[0x104: 0x304]
+
+
+def test_options_after_arguments(monkeypatch, tmpdir):
+    memory = bytes(range(256))
+    device = VirtualDevice({mboot_cli.PropertyTag.FLASH_SECTOR_SIZE: 0x400}, memory)
+    monkeypatch.setattr(mboot_cli, 'scan_usb', lambda name: [device])
+    runner = CliRunner()
+    out_file = tmpdir.join('dump.bin')
+    result = runner.invoke(mboot_cli.cli, ['read', '0', '0x10', '-f', str(out_file)], obj={})
+    assert result.exit_code == 0
+    assert out_file.read_binary() == memory[:0x10]
+    result = runner.invoke(mboot_cli.cli, ['read', '0x10', '0x10', '-c'], obj={})
+    assert result.exit_code == 0
+    assert ' 00000010 | 10 11 12 13' in result.output
+    result = runner.invoke(mboot_cli.cli, ['write', str(out_file), '-a', '0x100'], obj={})
+    assert result.exit_code == 0
+    assert device.received == memory[:0x10]
+    assert not device.is_opened
+
+
+def test_sbfile_command(monkeypatch, tmpdir):
+    device = VirtualDevice()
+    monkeypatch.setattr(mboot_cli, 'scan_usb', lambda name: [device])
+    sb_file = tmpdir.join('image.sb')
+    sb_file.write_binary(bytes(range(256)) * 8)
+    result = CliRunner().invoke(mboot_cli.cli, ['sbfile', str(sb_file)], obj={})
+    assert result.exit_code == 0
+    assert device.received == bytes(range(256)) * 8
+    sb_file.write_binary(b'')
+    result = CliRunner().invoke(mboot_cli.cli, ['sbfile', str(sb_file)], obj={})
+    assert result.exit_code != 0
+    assert 'The SB file is empty' in result.output
+    assert device.commands.count(mboot_cli.CommandTag.RECEIVE_SB_FILE) == 1
+
+
+@pytest.mark.parametrize('ext', ['.bin', '.hex', '.srec'])
+def test_write_command(monkeypatch, tmpdir, ext):
+    import bincopy
+    data = bytes(range(256)) * 3
+    image = bincopy.BinFile()
+    image.add_binary(data, 0x1000)
+    img_file = tmpdir.join('image' + ext)
+    if ext == '.bin':
+        img_file.write_binary(data)
+    else:
+        img_file.write(image.as_ihex() if ext == '.hex' else image.as_srec())
+    device = VirtualDevice({mboot_cli.PropertyTag.FLASH_SECTOR_SIZE: 0x400})
+    monkeypatch.setattr(mboot_cli, 'scan_usb', lambda name: [device])
+    result = CliRunner().invoke(mboot_cli.cli, ['write', '-o', '0x10', str(img_file)], obj={})
+    assert result.exit_code == 0
+    assert device.received == data[0x10:]
+
+
+def test_mlist_command(monkeypatch):
+    tag = mboot_cli.PropertyTag
+    device = VirtualDevice({tag.FLASH_START_ADDRESS: 0, tag.FLASH_SIZE: 0x80000, tag.FLASH_SECTOR_SIZE: 0x1000,
+                            tag.RAM_START_ADDRESS: 0x20000000, tag.RAM_SIZE: 0x10000})
+    monkeypatch.setattr(mboot_cli, 'scan_usb', lambda name: [device])
+    result = CliRunner().invoke(mboot_cli.cli, ['mlist'], obj={})
+    assert result.exit_code == 0
+    assert result.output.endswith(
+        " Internal Flash:\n"
+        "  0) 0x00000000 - 0x00080000, Size: 512.0 kiB, Sector Size: 4.0 kiB\n\n"
+        " Internal Ram:\n"
+        "  0) 0x20000000 - 0x20010000, Size: 64.0 kiB\n\n\n"
+    )
@@ -0,0 +1,93 @@
+# Copyright (c) 2019 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+
+import pytest
+from struct import pack
+from mboot import McuBoot, CommandTag, PropertyTag, StatusCode
+from mboot.commands import CmdPacket, parse_cmd_response
+from mboot.exceptions import McuBootConnectionError
+from mboot.connection import DevConnBase
+
+
+class VirtualDevice(DevConnBase):
+    """ Simple MBoot device simulator with properties and memory """
+
+    @property
+    def is_opened(self):
+        return self._opened
+
+    def __init__(self, properties=None, memory=b''):
+        super().__init__()
+        self._opened = False
+        self._rx = []
+        self.properties = properties or {}
+        self.memory = bytearray(memory)
+        self.commands = []
+        self.received = b''
+
+    def open(self):
+        self._opened = True
+
+    def close(self):
+        self._opened = False
+
+    def info(self):
+        return 'Virtual Device'
+
+    def read(self, timeout=1000):
+        return self._rx.pop(0)
+
+    def write(self, packet):
+        if not isinstance(packet, CmdPacket):
+            # data phase of last command
+            self.received += bytes(packet)
+            self._rx.append(self._response(0xA0, StatusCode.SUCCESS, self.commands[-1]))
+            return
+        tag = packet.header.tag
+        self.commands.append(tag)
+        if tag == CommandTag.GET_PROPERTY:
+            if packet.params[0] in self.properties:
+                params = (StatusCode.SUCCESS, self.properties[packet.params[0]])
+            else:
+                params = (StatusCode.UNKNOWN_PROPERTY,)
+            self._rx.append(self._response(0xA7, *params))
+        elif tag == CommandTag.READ_MEMORY:
+            address, length = packet.params[0], packet.params[1]
+            self._rx.append(self._response(0xA3, StatusCode.SUCCESS, length))
+            data = bytes(self.memory[address: address + length])
+            self._rx.extend(data[i: i + 56] for i in range(0, len(data), 56))
+            self._rx.append(self._response(0xA0, StatusCode.SUCCESS, tag))
+        else:
+            self._rx.append(self._response(0xA0, StatusCode.SUCCESS, tag))
+
+    @staticmethod
+    def _response(tag, *params):
+        return parse_cmd_response(pack(f'<4B{len(params)}L', tag, 0, 0, len(params), *params))
+
+
+def test_get_property():
+    device = VirtualDevice({PropertyTag.FLASH_SIZE: 0x80000})
+    with McuBoot(device) as mb:
+        assert mb.get_property(PropertyTag.FLASH_SIZE) == (0x80000,)
+        assert mb.status_code == StatusCode.SUCCESS
+        assert mb.get_property(PropertyTag.RAM_SIZE) is None
+        assert mb.status_code == StatusCode.UNKNOWN_PROPERTY
+        assert device.commands.count(CommandTag.GET_PROPERTY) == 2
+
+
+def test_read_memory():
+    memory = bytes(range(256)) * 4
+    with McuBoot(VirtualDevice(memory=memory), True) as mb:
+        assert mb.read_memory(0x10, 0x300) == memory[0x10: 0x310]
+        assert list(mb.read_memory_iter(0x10, 0x300, chunk_size=0x100)) == \
+            [memory[0x10: 0x100], memory[0x100: 0x200], memory[0x200: 0x300], memory[0x300: 0x310]]
+    # short chunk is reported instead of truncated data
+    with McuBoot(VirtualDevice(memory=memory)) as mb:
+        chunks = mb.read_memory_iter(0x380, 0x100, chunk_size=0x80)
+        assert next(chunks) == memory[0x380:]
+        with pytest.raises(McuBootConnectionError):
+            next(chunks)
@@ -9,7 +9,20 @@ import pytest
 from mboot.properties import Version, BoolValue, EnumValue, IntValue, VersionValue, ReservedRegionsValue, \
                              AvailableCommandsValue, AvailablePeripheralsValue, ExternalMemoryAttributesValue, \
                              DeviceUidValue, FlashReadMargin, IrqNotifierPinValue, PfrKeystoreUpdateOpt, \
-                             parse_property_value, PropertyTag
+                             parse_property_value, PropertyTag, size_fmt
+
+
+def test_size_fmt():
+    assert size_fmt(0) == '0 B'
+    assert size_fmt(1023) == '1023 B'
+    assert size_fmt(1024) == '1.0 kiB'
+    assert size_fmt(1536.0) == '1.5 kiB'
+    assert size_fmt(-2048) == '-2.0 kiB'
+    assert size_fmt(0x100000) == '1.0 MiB'
+    assert size_fmt(999, False) == '999 B'
+    assert size_fmt(1000, False) == '1.0 kB'
+    assert size_fmt(2500000, False) == '2.5 MB'
+    assert size_fmt(1 << 60) == '1024.0 PiB'
 
 
 def test_version_class():